@@ -5,7 +5,14 @@ Spawns dbgcapture.exe, reads JSON lines from stdout, stores entries in a
 ring buffer, and provides filtered views via sessions.
 """
 
+import bisect
+import functools
+import heapq
+import itertools
 import json
+import locale
+import logging
+import operator
 import os
 import re
 import subprocess
@@ -13,15 +20,218 @@ import sys
 import threading
 import time
 import uuid
+import weakref
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional, Sequence
 from collections import deque
 
 import psutil
 
+try:
+    import re2 as _re2  # Optional: linear-time matching via google-re2
+except ImportError:
+    _re2 = None
 
-@dataclass
+try:
+    import ahocorasick  # Optional: single-pass matching of literal filters
+except ImportError:
+    ahocorasick = None
+
+logger = logging.getLogger(__name__)
+
+# All session filters compile with the same flags so identical pattern strings
+# share one cached compiled pattern across sessions
+_FILTER_FLAGS = re.IGNORECASE
+
+
+@functools.lru_cache(maxsize=512)
+def _compile(pattern: str, flags: int = 0) -> re.Pattern:
+    """Compile a regex pattern, memoized by (pattern, flags)."""
+    logger.debug("Compiling filter pattern %r (flags=%d)", pattern, flags)
+    return re.compile(pattern, flags)
+
+
+def compile_pattern(pattern: str) -> re.Pattern:
+    """
+    Compile a session filter pattern (case-insensitive), reusing cached results.
+    
+    Raises re.error for invalid patterns; failures are not cached.
+    """
+    return _compile(pattern, _FILTER_FLAGS)
+
+
+@functools.lru_cache(maxsize=512)
+def _compile_re2(pattern: str):
+    """Compile a pattern with google-re2, memoized by pattern string."""
+    logger.debug("Compiling RE2 pattern %r", pattern)
+    options = _re2.Options()
+    options.log_errors = False
+    return _re2.compile(pattern, options)
+
+
+# Flags that can be scoped to a single alternative with (?flags:...)
+_INLINE_FLAGS = (
+    (re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"),
+    (re.VERBOSE, "x"), (re.ASCII, "a"),
+)
+_FUSABLE_FLAGS = functools.reduce(operator.or_, (flag for flag, _ in _INLINE_FLAGS), re.UNICODE)
+
+# Backreferences and numbered conditionals depend on group numbering, which
+# changes when patterns are fused
+_BACKREF = re.compile(r"\\[1-9]|\(\?P=|\(\?\(\d")
+
+
+# Flags RE2 interprets the same way as Python's re for ASCII patterns and text
+_RE2_FLAGS = re.IGNORECASE | re.MULTILINE | re.DOTALL | re.UNICODE
+
+# Syntax whose meaning is the same in RE2 and Python's re on ASCII text:
+# literals, escaped punctuation, plain and non-capturing groups, counted
+# repetition and character classes without shorthand escapes. Anything else
+# ($, \b, \d/\w/\s, lookarounds, POSIX classes, ...) stays with Python's re.
+_RE2_SAFE = re.compile(r"""
+    (?:
+        [^\\$\[\]{}(]                                       # literals, . ^ * + ? | )
+      | \\[^\w\s] | \\[ntrf]                                # escapes
+      | \{\d+(?:,\d*)?\}                                    # counted repetition
+      | \((?!\?) | \(\?:                                    # groups
+      | \[\^?(?:[^\\\[\]] | \\[^\w\s] | \\[ntrf])+\]        # character classes
+    )*
+""", re.VERBOSE)
+
+
+def _union_source(patterns: Sequence[re.Pattern]) -> Optional[str]:
+    """Join patterns into one alternation, each keeping its own flags, or None if unsafe."""
+    parts = []
+    for p in patterns:
+        if not isinstance(p.pattern, str) or _BACKREF.search(p.pattern):
+            return None
+        if p.flags & ~_FUSABLE_FLAGS:
+            return None
+        inline = "".join(c for flag, c in _INLINE_FLAGS if p.flags & flag)
+        parts.append(f"(?{inline}:{p.pattern})")
+    return "|".join(parts)
+
+
+# The google-re2 wrapper costs several microseconds per search; one RE2 pass
+# only beats searching each pattern with re from about this many patterns
+_RE2_MIN_PATTERNS = 16
+
+
+def _fuse_re2(patterns: Sequence[re.Pattern]):
+    """
+    Fuse patterns into a google-re2 alternation, for searching ASCII text only.
+    
+    Returns None unless RE2 is installed, there are at least
+    _RE2_MIN_PATTERNS patterns, and every pattern is ASCII syntax that means
+    the same thing in both engines (see _RE2_SAFE).
+    """
+    if _re2 is None or len(patterns) < _RE2_MIN_PATTERNS:
+        return None
+    
+    for p in patterns:
+        if not isinstance(p.pattern, str) or not p.pattern.isascii():
+            return None
+        if p.flags & ~_RE2_FLAGS or not _RE2_SAFE.fullmatch(p.pattern):
+            return None
+    
+    union = _union_source(patterns)
+    if union is None:
+        return None
+    
+    try:
+        return _compile_re2(union)
+    except _re2.error:
+        return None
+
+
+# Patterns made only of ordinary characters and escaped punctuation
+_LITERAL = re.compile(r"(?:[^\\.^$*+?{}\[\]|()]|\\\W)+")
+_LITERAL_ESCAPE = re.compile(r"\\(\W)")
+
+# Below this many literals searching each pattern is as fast as an Aho-Corasick pass
+_AHOCORASICK_MIN_LITERALS = 4
+
+
+def _as_literal(pattern: re.Pattern) -> Optional[str]:
+    """Return the lowercased text a case-insensitive literal pattern matches, else None."""
+    if not isinstance(pattern.pattern, str) or pattern.flags & re.VERBOSE:
+        return None
+    if not pattern.flags & re.IGNORECASE or not _LITERAL.fullmatch(pattern.pattern):
+        return None
+    literal = _LITERAL_ESCAPE.sub(r"\1", pattern.pattern)
+    return literal.lower() if literal.isascii() else None
+
+
+def _search_any(re2_union, patterns: Sequence[re.Pattern], text: str, ascii: bool) -> bool:
+    if re2_union is not None and ascii:
+        return re2_union.search(text) is not None
+    # A plain loop: a fused stdlib alternation measured no faster at any size
+    for p in patterns:
+        if p.search(text):
+            return True
+    return False
+
+
+class _PatternMatcher:
+    """
+    Checks whether any of a list of patterns matches, with as few searches as possible.
+    
+    Patterns are searched one by one, or as a single google-re2 alternation
+    over ASCII text when every pattern means the same in RE2. When
+    pyahocorasick is installed and there are enough case-insensitive literals (e.g. ``\\[ERROR\\]``), those
+    are matched in a single Aho-Corasick pass over ASCII text instead, and
+    only the remaining patterns go through the regex engine.
+    """
+    
+    def __init__(self, patterns: tuple[re.Pattern, ...]):
+        self._patterns = patterns
+        self._re2_union = _fuse_re2(patterns)
+        self._automaton = None
+        
+        if ahocorasick is None:
+            return
+        
+        literals = [(p, _as_literal(p)) for p in patterns]
+        words = {lit for _, lit in literals if lit}
+        if len(words) < _AHOCORASICK_MIN_LITERALS:
+            return
+        
+        self._automaton = ahocorasick.Automaton()
+        for word in words:
+            self._automaton.add_word(word, word)
+        self._automaton.make_automaton()
+        self._rest = [p for p, lit in literals if not lit]
+        self._rest_re2_union = _fuse_re2(self._rest)
+    
+    def search(self, text: str) -> bool:
+        """Return True if any pattern matches text."""
+        # Lowercasing (and RE2) only mirror Python's re exactly for ASCII text
+        ascii = text.isascii()
+        if self._automaton is not None and ascii:
+            for _ in self._automaton.iter(text.lower()):
+                return True
+            return _search_any(self._rest_re2_union, self._rest, text, ascii)
+        return _search_any(self._re2_union, self._patterns, text, ascii)
+
+
+def _pattern_search(patterns: tuple[re.Pattern, ...]):
+    """
+    Return the cheapest callable that searches text for any of patterns.
+    
+    Returns None when the caller should just loop over patterns itself:
+    without an automaton or RE2 union, _PatternMatcher.search would only add
+    call overhead to that loop.
+    """
+    matcher = _PatternMatcher(patterns)
+    if matcher._automaton is not None or matcher._re2_union is not None:
+        return matcher.search
+    if len(patterns) == 1:
+        return patterns[0].search
+    return None
+
+
+@dataclass(slots=True, frozen=True)
 class DebugEntry:
     """A single debug output entry."""
     seq: int
@@ -31,35 +241,83 @@ class DebugEntry:
     process_name: Optional[str] = None
 
 
-@dataclass
+def _serialize_entries(entries: list[DebugEntry]) -> list[dict]:
+    """Convert entries to the dicts returned by get_output."""
+    return [
+        {
+            "seq": e.seq,
+            "time": e.time,
+            "pid": e.pid,
+            "process_name": e.process_name,
+            "text": e.text
+        }
+        for e in entries
+    ]
+
+
+@dataclass(frozen=True)
 class FilterSet:
-    """Filter configuration for a session."""
-    include_patterns: list[re.Pattern] = field(default_factory=list)
-    exclude_patterns: list[re.Pattern] = field(default_factory=list)
-    process_names: list[re.Pattern] = field(default_factory=list)
-    process_pids: list[int] = field(default_factory=list)
+    """
+    Filter configuration for a session.
+    
+    Immutable and hashable, so sessions with identical filters can share one
+    instance (and its compiled matchers). Pattern lists are stored as tuples.
+    """
+    include_patterns: tuple[re.Pattern, ...] = ()
+    exclude_patterns: tuple[re.Pattern, ...] = ()
+    process_names: tuple[re.Pattern, ...] = ()
+    process_pids: tuple[int, ...] = ()
+    _process_pids_set: frozenset = field(init=False, repr=False, compare=False)
+    _include_search: Optional[Callable] = field(init=False, repr=False, compare=False)
+    _exclude_search: Optional[Callable] = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Accept any iterables, but store tuples so the set stays hashable
+        for name in ("include_patterns", "exclude_patterns", "process_names", "process_pids"):
+            object.__setattr__(self, name, tuple(getattr(self, name)))
+        
+        object.__setattr__(self, "_process_pids_set", frozenset(self.process_pids))
+        object.__setattr__(self, "_include_search", _pattern_search(self.include_patterns))
+        object.__setattr__(self, "_exclude_search", _pattern_search(self.exclude_patterns))
     
     def matches(self, entry: DebugEntry) -> bool:
         """Check if an entry matches this filter set."""
-        # Check process filters first
-        if self.process_pids and entry.pid not in self.process_pids:
+        # Cheapest checks first: PID set lookup, then the text regexes, then
+        # the per-pattern process name loop
+        if self._process_pids_set and entry.pid not in self._process_pids_set:
             return False
         
-        if self.process_names:
-            if not entry.process_name:
-                return False
-            name_match = any(p.search(entry.process_name) for p in self.process_names)
-            if not name_match:
-                return False
+        text = entry.text
         
         # Check exclude patterns
-        for pattern in self.exclude_patterns:
-            if pattern.search(entry.text):
-                return False
+        if self.exclude_patterns:
+            search = self._exclude_search
+            if search is not None:
+                if search(text):
+                    return False
+            else:
+                for p in self.exclude_patterns:
+                    if p.search(text):
+                        return False
         
         # Check include patterns (if any defined, at least one must match)
         if self.include_patterns:
-            if not any(p.search(entry.text) for p in self.include_patterns):
+            search = self._include_search
+            if search is not None:
+                if not search(text):
+                    return False
+            else:
+                for p in self.include_patterns:
+                    if p.search(text):
+                        break
+                else:
+                    return False
+        
+        if self.process_names:
+            if not entry.process_name:
+                return False
+            name_match = any(p.search(entry.process_name) for p in self.process_names)
+            if not name_match:
                 return False
         
         return True
@@ -75,6 +333,154 @@ class Session:
     created_at: float
 
 
+class _LineBuffer:
+    """
+    Splits a pipe's output into decoded lines using large raw reads.
+    
+    One os.read() returns every line the capture process has written so far
+    (up to chunk_size bytes), instead of one readline() round trip per line.
+    """
+    
+    def __init__(self, stream, chunk_size: int = 65536):
+        self._fd = stream.fileno()
+        self._chunk_size = chunk_size
+        # Same encoding text-mode pipes use; dbgcapture.exe passes ANSI text through
+        self._encoding = locale.getpreferredencoding(False)
+        self._partial = b""
+    
+    def read_lines(self) -> Optional[list[str]]:
+        """Block until output is available and return the complete lines, or None at EOF."""
+        chunk = os.read(self._fd, self._chunk_size)
+        if not chunk:
+            return None
+        
+        data = self._partial + chunk
+        end = data.rfind(b"\n") + 1
+        self._partial = data[end:]
+        if not end:
+            return []
+        
+        # Decode all complete lines at once; a newline byte never appears
+        # inside a multibyte character in the ANSI code pages
+        return data[:end].decode(self._encoding, errors="replace").split("\n")[:-1]
+
+
+def _parse_records(lines: list[str]) -> list:
+    """
+    Parse a batch of JSON lines from dbgcapture.exe.
+    
+    The batch is decoded with a single json.loads() call; if any line is
+    malformed, lines are decoded one at a time and the bad ones skipped.
+    """
+    lines = [line for line in (raw.strip() for raw in lines) if line]
+    if not lines:
+        return []
+    
+    try:
+        return json.loads("[" + ",".join(lines) + "]")
+    except json.JSONDecodeError:
+        pass
+    
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            # Skip malformed lines
+            pass
+    return records
+
+
+# Seconds before a cached process name is checked against PID reuse
+_PROCESS_CACHE_TTL = 5.0
+
+# Past this many PID shards, merging them costs more than one filtered pass
+# over the whole ring
+_MAX_MERGED_SHARDS = 32
+
+
+def _seq_key(entry: DebugEntry) -> int:
+    return entry.seq
+
+
+def _after(entries: deque[DebugEntry], seq: int):
+    """Iterate entries (in sequence order) with a sequence number greater than seq."""
+    start = bisect.bisect_right(entries, seq, key=_seq_key)
+    count = len(entries) - start
+    if start <= count:
+        return itertools.islice(entries, start, None)
+    # A deque can only be walked from an end, so reach entries near the tail
+    # (the usual case for a caught-up cursor) from the right
+    tail = list(itertools.islice(reversed(entries), count))
+    tail.reverse()
+    return iter(tail)
+
+
+class EntryBuffer:
+    """
+    Ring buffer of debug entries with a secondary index by PID.
+    
+    Each PID's entries are also kept in their own deque so PID-filtered reads
+    only touch entries from those processes. Entries evicted from the ring are
+    evicted from their PID shard too.
+    """
+    
+    def __init__(self, maxlen: int):
+        self._entries: deque[DebugEntry] = deque()
+        self._by_pid: dict[int, deque[DebugEntry]] = {}
+        self.maxlen = maxlen
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __iter__(self):
+        return iter(self._entries)
+    
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the newest entry, or 0 if empty."""
+        return self._entries[-1].seq if self._entries else 0
+    
+    def append(self, entry: DebugEntry):
+        """Add an entry, evicting the oldest if the buffer is full."""
+        if len(self._entries) >= self.maxlen:
+            oldest = self._entries.popleft()
+            shard = self._by_pid[oldest.pid]
+            shard.popleft()
+            if not shard:
+                del self._by_pid[oldest.pid]
+        
+        self._entries.append(entry)
+        shard = self._by_pid.get(entry.pid)
+        if shard is None:
+            shard = self._by_pid[entry.pid] = deque()
+        shard.append(entry)
+    
+    def extend(self, entries):
+        """Add several entries in order."""
+        for entry in entries:
+            self.append(entry)
+    
+    def entries_after(self, seq: int, pids: Optional[list[int]] = None):
+        """
+        Iterate entries with a sequence number greater than seq, in order.
+        
+        Entries are appended in sequence order, so the starting point is found
+        by binary search. If pids is given, only those PIDs' entries are returned,
+        read from their shards unless there are too many to merge cheaply.
+        """
+        if not pids:
+            return _after(self._entries, seq)
+        
+        pid_set = frozenset(pids)
+        shards = [self._by_pid[pid] for pid in pid_set if pid in self._by_pid]
+        if len(shards) > _MAX_MERGED_SHARDS:
+            return (e for e in _after(self._entries, seq) if e.pid in pid_set)
+        if len(shards) == 1:
+            return _after(shards[0], seq)
+        return heapq.merge(*(_after(shard, seq) for shard in shards), key=_seq_key)
+
+
 class CaptureManager:
     """
     Singleton manager for debug output capture.
@@ -86,26 +492,56 @@ class CaptureManager:
     _instance: Optional["CaptureManager"] = None
     _lock = threading.Lock()
     
+    # Push a coarse union of all sessions' text filters to dbgcapture.exe so
+    # it can drop unwanted lines before they reach Python. Off by default: the
+    # bundled dbgcapture.exe does not read stdin yet, and a capture binary
+    # that does must accept set_filters commands whose patterns use Python re
+    # syntax (see _update_prefilter).
+    native_prefilter = False
+    
     def __new__(cls) -> "CaptureManager":
+        # Fast path once created: no lock needed to read the instance
+        instance = cls._instance
+        if instance is not None:
+            return instance
+        
         with cls._lock:
             if cls._instance is None:
-                cls._instance = super().__new__(cls)
-                cls._instance._initialized = False
+                instance = super().__new__(cls)
+                instance._initialized = False
+                instance._ensure_initialized()
+                cls._instance = instance
             return cls._instance
     
     def __init__(self):
+        # State is set up once in __new__; repeated construction is a no-op
+        pass
+    
+    def _ensure_initialized(self):
+        """Set up instance state on first construction."""
         if self._initialized:
             return
         
         self._initialized = True
-        self._buffer: deque[DebugEntry] = deque(maxlen=100000)  # 100K entries
+        self._buffer = EntryBuffer(maxlen=100000)  # 100K entries
         self._buffer_lock = threading.Lock()
+        # Copy-on-write: writers replace the dict under the lock, readers use
+        # whatever dict is current without locking
         self._sessions: dict[str, Session] = {}
         self._sessions_lock = threading.Lock()
+        self._filterset_intern: weakref.WeakValueDictionary[tuple, FilterSet] = weakref.WeakValueDictionary()
         self._process: Optional[subprocess.Popen] = None
         self._reader_thread: Optional[threading.Thread] = None
+        self._status_thread: Optional[threading.Thread] = None
+        self._command_thread: Optional[threading.Thread] = None
+        # Latest unsent command line per action, written by _command_loop
+        self._pending_commands: dict[str, bytes] = {}
+        self._commands_cond = threading.Condition()
         self._running = False
-        self._process_cache: dict[int, str] = {}  # PID -> process name cache
+        # Set once dbgcapture.exe reports it is listening for debug output
+        self._ready = threading.Event()
+        # PID -> (process name, create time, time last checked)
+        self._process_cache: dict[int, tuple[Optional[str], Optional[float], float]] = {}
         self._cache_lock = threading.Lock()
         self._current_seq = 0
         
@@ -135,57 +571,169 @@ class CaptureManager:
         return candidates[0].resolve()
     
     def _get_process_name(self, pid: int) -> Optional[str]:
-        """Get process name for a PID, with caching."""
+        """
+        Get process name for a PID, with caching.
+        
+        Cached names are revalidated against the process creation time once
+        they are older than _PROCESS_CACHE_TTL, so a recycled PID picks up the
+        new process's name. Lookups that fail are cached too, so entries from
+        an exited process don't query psutil every time.
+        """
+        now = time.monotonic()
         with self._cache_lock:
-            if pid in self._process_cache:
-                return self._process_cache[pid]
+            cached = self._process_cache.get(pid)
+        if cached is not None and now - cached[2] < _PROCESS_CACHE_TTL:
+            return cached[0]
         
         try:
             proc = psutil.Process(pid)
-            name = proc.name()
-            with self._cache_lock:
-                self._process_cache[pid] = name
-            return name
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            return None
+            create_time = proc.create_time()
+            if cached is not None and cached[1] == create_time:
+                name = cached[0]
+            else:
+                name = proc.name()
+        except psutil.NoSuchProcess:
+            # Keep the last known name for entries logged just before exit
+            create_time = cached[1] if cached else None
+            name = cached[0] if cached else None
+        except psutil.AccessDenied:
+            create_time = None
+            name = None
+        
+        with self._cache_lock:
+            self._process_cache[pid] = (name, create_time, now)
+        return name
     
     def _reader_loop(self):
         """Background thread that reads from dbgcapture.exe stdout."""
+        reader = None
         while self._running:
             process = self._process
             if process is None or process.poll() is not None:
                 break
             try:
-                line = self._process.stdout.readline()
-                if not line:
-                    continue
+                if reader is None:
+                    reader = _LineBuffer(process.stdout)
                 
-                line = line.strip()
-                if not line:
-                    continue
+                lines = reader.read_lines()
+                if lines is None:
+                    break  # Capture process closed its output
                 
-                try:
-                    data = json.loads(line)
-                    entry = DebugEntry(
-                        seq=data["seq"],
-                        time=data["time"],
-                        pid=data["pid"],
-                        text=data["text"],
-                        process_name=self._get_process_name(data["pid"])
-                    )
-                    
+                entries = []
+                for data in _parse_records(lines):
+                    try:
+                        entries.append(DebugEntry(
+                            seq=data["seq"],
+                            time=data["time"],
+                            pid=data["pid"],
+                            text=data["text"],
+                            process_name=self._get_process_name(data["pid"])
+                        ))
+                    except (KeyError, TypeError):
+                        # Skip records missing fields
+                        pass
+                
+                if entries:
                     with self._buffer_lock:
-                        self._buffer.append(entry)
-                        self._current_seq = entry.seq
-                        
-                except (json.JSONDecodeError, KeyError):
-                    # Skip malformed lines
-                    pass
+                        self._buffer.extend(entries)
+                        self._current_seq = entries[-1].seq
+                    self._ready.set()
                     
             except Exception:
                 if self._running:
                     time.sleep(0.1)
     
+    def _status_loop(self, stream):
+        """Background thread that reads status lines from dbgcapture.exe stderr."""
+        reader = _LineBuffer(stream)
+        while True:
+            try:
+                lines = reader.read_lines()
+            except (OSError, ValueError):
+                break
+            if lines is None:
+                break
+            
+            for record in _parse_records(lines):
+                if isinstance(record, dict) and record.get("status") == "started":
+                    self._ready.set()
+    
+    def _command_loop(self, stream):
+        """Background thread that writes queued commands to dbgcapture.exe stdin."""
+        while True:
+            with self._commands_cond:
+                while self._running and not self._pending_commands:
+                    self._commands_cond.wait()
+                if not self._running:
+                    return
+                data = b"".join(self._pending_commands.values())
+                self._pending_commands.clear()
+            
+            # Only this thread writes, so lines never interleave, and a full
+            # pipe blocks here rather than in the caller
+            try:
+                stream.write(data)
+                stream.flush()
+            except (OSError, ValueError):
+                return
+    
+    def _send_command(self, action: str, **params) -> bool:
+        """
+        Queue a JSON command line for dbgcapture.exe's stdin without blocking.
+        
+        A command replaces any unsent one with the same action, so a slow
+        reader only ever gets the latest state. The caller must hold
+        _commands_cond.
+        """
+        if self._command_thread is None:
+            return False
+        
+        line = json.dumps({"action": action, **params}).encode() + b"\n"
+        self._pending_commands[action] = line
+        self._commands_cond.notify()
+        return True
+    
+    def _update_prefilter(self):
+        """
+        Send dbgcapture.exe the loosest filter that still passes every line any
+        session could want: the union of include patterns (none if any session
+        includes everything) and the exclude patterns common to all sessions.
+        Sessions still apply their own filters in Python, and every session
+        pattern is case-insensitive, so the command says so. Patterns are sent
+        as written, in Python re syntax.
+        """
+        if not self.native_prefilter:
+            return
+        
+        # Build and queue under the lock so the last queued command always
+        # reflects the latest filters, whichever thread changed them
+        with self._commands_cond:
+            self._queue_prefilter()
+    
+    def _queue_prefilter(self):
+        """Queue a set_filters command for the current sessions; holds _commands_cond."""
+        filter_sets = [s.filters for s in self._sessions.values()]
+        if not filter_sets:
+            return
+        
+        include: set[str] = set()
+        for filters in filter_sets:
+            if not filters.include_patterns:
+                include.clear()
+                break
+            include.update(p.pattern for p in filters.include_patterns)
+        
+        exclude = set.intersection(*(
+            {p.pattern for p in filters.exclude_patterns} for filters in filter_sets
+        ))
+        
+        self._send_command(
+            "set_filters",
+            include=sorted(include),
+            exclude=sorted(exclude),
+            ignore_case=bool(_FILTER_FLAGS & re.IGNORECASE),
+        )
+    
     def start_capture(self, global_capture: bool = False) -> bool:
         """Start the capture subprocess if not already running."""
         if self._process is not None and self._process.poll() is None:
@@ -198,19 +746,29 @@ class CaptureManager:
         if global_capture:
             args.append("--global")
         
+        self._ready.clear()
         try:
             self._process = subprocess.Popen(
                 args,
+                stdin=subprocess.PIPE if self.native_prefilter else None,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
+                bufsize=0,
                 creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
             )
             
             self._running = True
             self._reader_thread = threading.Thread(target=self._reader_loop, daemon=True)
             self._reader_thread.start()
+            self._status_thread = threading.Thread(
+                target=self._status_loop, args=(self._process.stderr,), daemon=True
+            )
+            self._status_thread.start()
+            if self.native_prefilter:
+                self._command_thread = threading.Thread(
+                    target=self._command_loop, args=(self._process.stdin,), daemon=True
+                )
+                self._command_thread.start()
             
             return True
             
@@ -219,7 +777,10 @@ class CaptureManager:
     
     def stop_capture(self):
         """Stop the capture subprocess."""
-        self._running = False
+        with self._commands_cond:
+            self._running = False
+            self._pending_commands.clear()
+            self._commands_cond.notify_all()
         
         if self._process:
             try:
@@ -235,6 +796,24 @@ class CaptureManager:
         if self._reader_thread:
             self._reader_thread.join(timeout=2)
             self._reader_thread = None
+        
+        if self._status_thread:
+            self._status_thread.join(timeout=2)
+            self._status_thread = None
+        
+        if self._command_thread:
+            self._command_thread.join(timeout=2)
+            self._command_thread = None
+        
+        self._ready.clear()
+    
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the capture process is listening for debug output.
+        
+        Returns False if it is not ready within timeout seconds.
+        """
+        return self._ready.wait(timeout)
     
     def is_running(self) -> bool:
         """Check if capture is currently running."""
@@ -256,8 +835,9 @@ class CaptureManager:
         )
         
         with self._sessions_lock:
-            self._sessions[session_id] = session
+            self._sessions = {**self._sessions, session_id: session}
         
+        self._update_prefilter()
         return session_id
     
     def destroy_session(self, session_id: str) -> bool:
@@ -265,18 +845,20 @@ class CaptureManager:
         with self._sessions_lock:
             if session_id not in self._sessions:
                 return False
-            del self._sessions[session_id]
+            sessions = dict(self._sessions)
+            del sessions[session_id]
+            self._sessions = sessions
             
             # Stop capture if no sessions left
             if not self._sessions:
                 self.stop_capture()
         
+        self._update_prefilter()
         return True
     
     def get_session(self, session_id: str) -> Optional[Session]:
         """Get a session by ID."""
-        with self._sessions_lock:
-            return self._sessions.get(session_id)
+        return self._sessions.get(session_id)
     
     def set_filters(
         self,
@@ -291,21 +873,20 @@ class CaptureManager:
         if not session:
             return False
         
-        filters = FilterSet()
-        
-        if include:
-            filters.include_patterns = [re.compile(p, re.IGNORECASE) for p in include]
-        
-        if exclude:
-            filters.exclude_patterns = [re.compile(p, re.IGNORECASE) for p in exclude]
-        
-        if process_names:
-            filters.process_names = [re.compile(p, re.IGNORECASE) for p in process_names]
+        key = (
+            tuple(compile_pattern(p) for p in include or ()),
+            tuple(compile_pattern(p) for p in exclude or ()),
+            tuple(compile_pattern(p) for p in process_names or ()),
+            tuple(process_pids or ()),
+        )
         
-        if process_pids:
-            filters.process_pids = process_pids
+        # Share one FilterSet between sessions with identical filters
+        filters = self._filterset_intern.get(key)
+        if filters is None:
+            filters = self._filterset_intern.setdefault(key, FilterSet(*key))
         
         session.filters = filters
+        self._update_prefilter()
         return True
     
     def get_output(
@@ -324,35 +905,26 @@ class CaptureManager:
         if not session:
             return [], 0
         
+        # Nothing can be returned, so leave the cursor where it is
+        if limit <= 0:
+            return [], session.cursor
+        
         start_seq = since_seq if since_seq is not None else session.cursor
-        results = []
-        max_seq = start_seq
         
         with self._buffer_lock:
-            for entry in self._buffer:
-                if entry.seq <= start_seq:
-                    continue
-                
-                if session.filters.matches(entry):
-                    results.append({
-                        "seq": entry.seq,
-                        "time": entry.time,
-                        "pid": entry.pid,
-                        "process_name": entry.process_name,
-                        "text": entry.text
-                    })
-                    
-                    if len(results) >= limit:
-                        max_seq = entry.seq
-                        break
-                
-                max_seq = entry.seq
+            candidates = self._buffer.entries_after(start_seq, session.filters.process_pids)
+            matched = list(itertools.islice(filter(session.filters.matches, candidates), limit))
+            last_seq = self._buffer.last_seq
+        
+        # Build the result dicts outside the buffer lock
+        results = _serialize_entries(matched)
         
-        # Update session cursor
+        # Update session cursor; with fewer than limit matches everything
+        # buffered was scanned, so the cursor can move past it all
         if results:
             session.cursor = results[-1]["seq"]
-        elif max_seq > session.cursor:
-            session.cursor = max_seq
+        if len(results) < limit and last_seq > session.cursor:
+            session.cursor = last_seq
         
         return results, session.cursor
     
@@ -372,12 +944,9 @@ class CaptureManager:
             return None
         
         # Count pending entries
-        pending = 0
         with self._buffer_lock:
-            for entry in self._buffer:
-                if entry.seq > session.cursor:
-                    if session.filters.matches(entry):
-                        pending += 1
+            candidates = self._buffer.entries_after(session.cursor, session.filters.process_pids)
+            pending = sum(1 for _ in filter(session.filters.matches, candidates))
         
         return {
             "session_id": session.id,
@@ -386,7 +955,7 @@ class CaptureManager:
                 "include": [p.pattern for p in session.filters.include_patterns],
                 "exclude": [p.pattern for p in session.filters.exclude_patterns],
                 "process_names": [p.pattern for p in session.filters.process_names],
-                "process_pids": session.filters.process_pids
+                "process_pids": list(session.filters.process_pids)
             },
             "cursor": session.cursor,
             "pending_count": pending,
@@ -396,7 +965,7 @@ class CaptureManager:
     
     def list_processes(self, name_pattern: Optional[str] = None) -> list[dict]:
         """List running processes, optionally filtered by name."""
-        pattern = re.compile(name_pattern, re.IGNORECASE) if name_pattern else None
+        pattern = compile_pattern(name_pattern) if name_pattern else None
         results = []
         
         for proc in psutil.process_iter(["pid", "name"]):
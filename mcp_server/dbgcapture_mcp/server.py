@@ -16,7 +16,7 @@ from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
 
 from . import __version__
-from .capture_manager import get_manager
+from .capture_manager import compile_pattern, get_manager
 
 
 def create_server() -> Server:
@@ -101,7 +101,8 @@ def create_server() -> Server:
                         "limit": {
                             "type": "integer",
                             "description": "Maximum entries to return (default 100)",
-                            "default": 100
+                            "default": 100,
+                            "minimum": 1
                         },
                         "since_seq": {
                             "type": "integer",
@@ -198,7 +199,7 @@ def create_server() -> Server:
                     patterns = arguments.get(field, [])
                     for p in patterns:
                         try:
-                            re.compile(p)
+                            compile_pattern(p)
                         except re.error as e:
                             return [TextContent(
                                 type="text",
@@ -281,13 +282,12 @@ def create_server() -> Server:
             
             elif name == "list_sessions":
                 sessions = []
-                with manager._sessions_lock:
-                    for session in manager._sessions.values():
-                        sessions.append({
-                            "session_id": session.id,
-                            "name": session.name,
-                            "cursor": session.cursor
-                        })
+                for session in manager._sessions.values():
+                    sessions.append({
+                        "session_id": session.id,
+                        "name": session.name,
+                        "cursor": session.cursor
+                    })
                 
                 return [TextContent(
                     type="text",
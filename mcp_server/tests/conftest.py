@@ -0,0 +1,10 @@
+"""
+Shared pytest configuration for the test suite.
+"""
+
+import sys
+
+# Debug capture only works on Windows; don't even import the integration tests elsewhere
+collect_ignore = []
+if sys.platform != "win32":
+    collect_ignore.append("test_integration.py")
@@ -2,6 +2,9 @@
 Unit tests for the CaptureManager and FilterSet classes.
 """
 
+import json
+import os
+import queue
 import re
 import pytest
 from unittest.mock import Mock, patch, MagicMock
@@ -11,10 +14,19 @@ from dbgcapture_mcp.capture_manager import (
     DebugEntry,
     FilterSet,
     Session,
+    EntryBuffer,
     CaptureManager,
+    compile_pattern,
     get_manager,
+    _LineBuffer,
+    _parse_records,
+    _fuse_re2,
+    _RE2_MIN_PATTERNS,
 )
 
+# Enough RE2-compatible, non-literal patterns to make a filter use RE2
+_RE2_PADDING = [compile_pattern(f"z[z]q{k}") for k in range(_RE2_MIN_PATTERNS)]
+
 
 class TestDebugEntry:
     """Tests for DebugEntry dataclass."""
@@ -47,6 +59,16 @@ class TestDebugEntry:
 class TestFilterSet:
     """Tests for FilterSet class."""
 
+    @pytest.fixture(params=["re", "re2"])
+    def regex_engine(self, request):
+        """Run a test without google-re2, and again with it when installed."""
+        if request.param == "re2":
+            pytest.importorskip("re2")
+            yield request.param
+        else:
+            with patch('dbgcapture_mcp.capture_manager._re2', None):
+                yield request.param
+
     def test_empty_filter_matches_everything(self):
         """Empty filter should match all entries."""
         filter_set = FilterSet()
@@ -82,6 +104,93 @@ class TestFilterSet:
         assert filter_set.matches(warn_entry) is True
         assert filter_set.matches(info_entry) is False
 
+    def test_multiple_patterns_keep_individual_flags(self):
+        """Fused patterns should keep each pattern's own case sensitivity."""
+        filter_set = FilterSet(
+            include_patterns=[
+                re.compile(r"error", re.IGNORECASE),
+                re.compile(r"Warn"),
+            ]
+        )
+        
+        assert filter_set.matches(DebugEntry(seq=1, time=0, pid=1, text="ERROR")) is True
+        assert filter_set.matches(DebugEntry(seq=2, time=0, pid=1, text="Warn")) is True
+        assert filter_set.matches(DebugEntry(seq=3, time=0, pid=1, text="WARN")) is False
+
+    def test_patterns_with_backreferences(self):
+        """Patterns using backreferences should still match correctly."""
+        filter_set = FilterSet(
+            include_patterns=[
+                re.compile(r"(ab)\1"),
+                re.compile(r"(x)(y)\2"),
+            ]
+        )
+        
+        assert filter_set.matches(DebugEntry(seq=1, time=0, pid=1, text="abab")) is True
+        assert filter_set.matches(DebugEntry(seq=2, time=0, pid=1, text="xyy")) is True
+        assert filter_set.matches(DebugEntry(seq=3, time=0, pid=1, text="xyx")) is False
+
+    def test_patterns_with_numbered_conditionals(self):
+        """Conditional group references should keep pointing at their own pattern's group."""
+        filter_set = FilterSet(
+            include_patterns=[
+                re.compile(r"(x)"),
+                re.compile(r"(y)?(?(1)a|b)"),
+            ]
+        )
+
+        assert filter_set.matches(DebugEntry(seq=1, time=0, pid=1, text="ya")) is True
+        assert filter_set.matches(DebugEntry(seq=2, time=0, pid=1, text="a")) is False
+
+    def test_multiple_patterns_keep_ascii_flag(self, regex_engine):
+        """Fused patterns should keep each pattern's ASCII-only matching."""
+        filter_set = FilterSet(
+            include_patterns=[re.compile(r"^\w$", re.ASCII), *_RE2_PADDING]
+        )
+
+        assert filter_set.matches(DebugEntry(seq=1, time=0, pid=1, text="e")) is True
+        assert filter_set.matches(DebugEntry(seq=2, time=0, pid=1, text="é")) is False
+
+    @pytest.mark.parametrize("pattern, text", [
+        (r"done$", "done\n"),
+        (r"\bcafé\b", "un café!"),
+        (r"^\d+$", "\u0661\u0662\u0663"),
+    ])
+    def test_patterns_match_like_python_re(self, regex_engine, pattern, text):
+        """Filters should match exactly what Python's re matches, whatever engine runs them."""
+        patterns = [compile_pattern(pattern), *_RE2_PADDING]
+        entry = DebugEntry(seq=1, time=0, pid=1, text=text)
+        
+        assert FilterSet(include_patterns=patterns).matches(entry) is True
+        assert FilterSet(exclude_patterns=patterns).matches(entry) is False
+
+    def test_re2_only_for_many_patterns(self, regex_engine):
+        """RE2 should only take over once there are enough patterns to pay for its call overhead."""
+        few = _RE2_PADDING[:2]
+        assert _fuse_re2(few) is None
+        assert (_fuse_re2(_RE2_PADDING) is not None) == (regex_engine == "re2")
+        
+        filter_set = FilterSet(include_patterns=_RE2_PADDING)
+        assert filter_set.matches(DebugEntry(seq=1, time=0, pid=1, text="x ZZQ7 y")) is True
+        assert filter_set.matches(DebugEntry(seq=2, time=0, pid=1, text="zzq")) is False
+
+    def test_many_literal_patterns(self):
+        """Literal and regex include patterns should combine correctly."""
+        filter_set = FilterSet(
+            include_patterns=[
+                re.compile(r"\[ERROR\]", re.IGNORECASE),
+                re.compile(r"\[WARN\]", re.IGNORECASE),
+                re.compile(r"fatal", re.IGNORECASE),
+                re.compile(r"assert\ failed", re.IGNORECASE),
+                re.compile(r"code \d+", re.IGNORECASE),
+            ]
+        )
+        
+        for text in ["[error] x", "[WARN] y", "FATAL", "Assert Failed", "code 42", "Ünïcode fatal"]:
+            assert filter_set.matches(DebugEntry(seq=1, time=0, pid=1, text=text)) is True, text
+        for text in ["[INFO] z", "code x", "Ünïcode"]:
+            assert filter_set.matches(DebugEntry(seq=1, time=0, pid=1, text=text)) is False, text
+
     def test_exclude_pattern_match(self):
         """Exclude pattern should reject matching entries."""
         filter_set = FilterSet(
@@ -154,6 +263,100 @@ class TestFilterSet:
         assert filter_set.matches(verbose) is False
 
 
+class TestEntryBuffer:
+    """Tests for the PID-indexed ring buffer."""
+
+    def test_entries_after_by_pid(self):
+        """PID-filtered reads should merge shards in sequence order."""
+        buffer = EntryBuffer(maxlen=100)
+        for seq, pid in enumerate([1, 2, 3, 1, 2, 3, 1], start=1):
+            buffer.append(DebugEntry(seq=seq, time=0, pid=pid, text=f"m{seq}"))
+        
+        assert [e.seq for e in buffer.entries_after(0)] == [1, 2, 3, 4, 5, 6, 7]
+        assert [e.seq for e in buffer.entries_after(2, [1, 3])] == [3, 4, 6, 7]
+        assert [e.seq for e in buffer.entries_after(0, [2])] == [2, 5]
+        assert list(buffer.entries_after(0, [99])) == []
+
+    def test_entries_after_many_pids(self):
+        """Large PID sets should return the same entries as a shard merge."""
+        buffer = EntryBuffer(maxlen=1000)
+        for seq in range(1, 501):
+            buffer.append(DebugEntry(seq=seq, time=0, pid=seq % 100, text=""))
+        
+        pids = list(range(0, 100, 2))
+        expected = [seq for seq in range(11, 501) if seq % 2 == 0]
+        assert [e.seq for e in buffer.entries_after(10, pids)] == expected
+
+    @pytest.mark.parametrize("seq", [0, 1, 49, 50, 51, 98, 99, 100, 150])
+    def test_entries_after_from_either_end(self, seq):
+        """Reads should return the same entries whether they start near the head or the tail."""
+        buffer = EntryBuffer(maxlen=100)
+        for n in range(1, 101):
+            buffer.append(DebugEntry(seq=n, time=0, pid=n % 2, text=""))
+        
+        assert [e.seq for e in buffer.entries_after(seq)] == list(range(seq + 1, 101))
+        assert [e.seq for e in buffer.entries_after(seq, [1])] == [
+            n for n in range(seq + 1, 101) if n % 2 == 1
+        ]
+
+    def test_eviction_updates_pid_index(self):
+        """Entries evicted from the ring should disappear from PID reads."""
+        buffer = EntryBuffer(maxlen=3)
+        for seq, pid in enumerate([1, 2, 1, 2, 2], start=1):
+            buffer.append(DebugEntry(seq=seq, time=0, pid=pid, text=f"m{seq}"))
+        
+        assert len(buffer) == 3
+        assert [e.seq for e in buffer] == [3, 4, 5]
+        assert [e.seq for e in buffer.entries_after(0, [1])] == [3]
+        assert [e.seq for e in buffer.entries_after(0, [2])] == [4, 5]
+
+
+class TestLineBuffer:
+    """Tests for the pipe line reader."""
+
+    def test_read_lines_joins_partial_lines(self):
+        """Lines split across reads should be reassembled."""
+        read_fd, write_fd = os.pipe()
+        try:
+            reader = _LineBuffer(MagicMock(fileno=lambda: read_fd))
+            
+            os.write(write_fd, b'{"seq":1}\n{"seq"')
+            assert reader.read_lines() == ['{"seq":1}']
+            
+            os.write(write_fd, b':2')
+            assert reader.read_lines() == []
+            
+            os.write(write_fd, b'}\n')
+            assert reader.read_lines() == ['{"seq":2}']
+        finally:
+            os.close(write_fd)
+            os.close(read_fd)
+
+    def test_read_lines_eof(self):
+        """Closed pipe should return None."""
+        read_fd, write_fd = os.pipe()
+        os.close(write_fd)
+        try:
+            reader = _LineBuffer(MagicMock(fileno=lambda: read_fd))
+            assert reader.read_lines() is None
+        finally:
+            os.close(read_fd)
+
+
+class TestParseRecords:
+    """Tests for batch JSON line parsing."""
+
+    def test_parse_batch(self):
+        """All lines in a well-formed batch should be parsed."""
+        lines = ['{"seq":1,"text":"a"}', '', '{"seq":2,"text":"b"}\r']
+        assert _parse_records(lines) == [{"seq": 1, "text": "a"}, {"seq": 2, "text": "b"}]
+
+    def test_parse_skips_malformed_lines(self):
+        """A malformed line should not drop the rest of the batch."""
+        lines = ['{"seq":1}', '{"seq":', '{"seq":3}']
+        assert _parse_records(lines) == [{"seq": 1}, {"seq": 3}]
+
+
 class TestSession:
     """Tests for Session dataclass."""
 
@@ -180,10 +383,11 @@ class TestCaptureManager:
         # Reset singleton for testing
         CaptureManager._instance = None
         
-        with patch('dbgcapture_mcp.capture_manager.subprocess') as mock_subprocess:
+        with patch('dbgcapture_mcp.capture_manager.subprocess') as mock_subprocess, \
+             patch('dbgcapture_mcp.capture_manager.os') as mock_os:
             mock_process = MagicMock()
             mock_process.poll.return_value = None  # Process is running
-            mock_process.stdout.readline.return_value = ""
+            mock_os.read.return_value = b""  # Capture output at EOF
             mock_subprocess.Popen.return_value = mock_process
             mock_subprocess.CREATE_NO_WINDOW = 0
             
@@ -208,6 +412,25 @@ class TestCaptureManager:
         finally:
             CaptureManager._instance = None
 
+    def test_singleton_concurrent_creation(self):
+        """Concurrent construction should yield one fully initialized instance."""
+        CaptureManager._instance = None
+        try:
+            results = []
+            threads = [
+                threading.Thread(target=lambda: results.append(CaptureManager()))
+                for _ in range(8)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            
+            assert all(m is results[0] for m in results)
+            assert results[0]._sessions == {}
+        finally:
+            CaptureManager._instance = None
+
     def test_create_session(self, mock_manager):
         """Test session creation."""
         session_id = mock_manager.create_session("test")
@@ -233,6 +456,17 @@ class TestCaptureManager:
         assert result is True
         assert mock_manager.get_session(session_id) is None
 
+    def test_sessions_copy_on_write(self, mock_manager):
+        """Creating and destroying sessions should not mutate a snapshot."""
+        first = mock_manager.create_session("first")
+        snapshot = mock_manager._sessions
+
+        second = mock_manager.create_session("second")
+        mock_manager.destroy_session(first)
+
+        assert list(snapshot) == [first]
+        assert list(mock_manager._sessions) == [second]
+
     def test_destroy_nonexistent_session(self, mock_manager):
         """Destroying nonexistent session should return False."""
         result = mock_manager.destroy_session("nonexistent")
@@ -253,7 +487,81 @@ class TestCaptureManager:
         session = mock_manager.get_session(session_id)
         assert len(session.filters.include_patterns) == 1
         assert len(session.filters.exclude_patterns) == 1
-        assert session.filters.process_pids == [1234]
+        assert session.filters.process_pids == (1234,)
+
+    def test_set_filters_reuses_compiled_patterns(self, mock_manager):
+        """Identical filter strings should share one compiled pattern."""
+        s1 = mock_manager.create_session("one")
+        s2 = mock_manager.create_session("two")
+        mock_manager.set_filters(s1, include=[r"\[ERROR\]"])
+        mock_manager.set_filters(s2, include=[r"\[ERROR\]"])
+        
+        p1 = mock_manager.get_session(s1).filters.include_patterns[0]
+        p2 = mock_manager.get_session(s2).filters.include_patterns[0]
+        assert p1 is p2
+
+    def test_set_filters_shares_identical_filter_sets(self, mock_manager):
+        """Sessions with identical filters should share one FilterSet."""
+        s1 = mock_manager.create_session("one")
+        s2 = mock_manager.create_session("two")
+        mock_manager.set_filters(s1, include=["A", "B"], process_pids=[1])
+        mock_manager.set_filters(s2, include=["A", "B"], process_pids=[1])
+        
+        f1 = mock_manager.get_session(s1).filters
+        f2 = mock_manager.get_session(s2).filters
+        assert f1 is f2
+        
+        mock_manager.set_filters(s2, include=["A"])
+        assert mock_manager.get_session(s2).filters is not f1
+
+    def test_set_filters_native_prefilter(self, mock_manager):
+        """Native prefilter should receive the union of session filters."""
+        mock_manager.native_prefilter = True
+        s1 = mock_manager.create_session("one")
+        s2 = mock_manager.create_session("two")
+        writes = queue.Queue()
+        mock_manager._process.stdin.write.side_effect = writes.put
+        
+        def wait_for_command(predicate):
+            # Commands are written by a background thread and may be coalesced
+            while True:
+                sent = json.loads(writes.get(timeout=2).splitlines()[-1])
+                if predicate(sent):
+                    return sent
+        
+        mock_manager.set_filters(s1, include=["A"], exclude=["NOISE", "SPAM"])
+        mock_manager.set_filters(s2, include=["B"], exclude=["NOISE"])
+        sent = wait_for_command(lambda c: c["include"] == ["A", "B"])
+        assert sent == {
+            "action": "set_filters",
+            "include": ["A", "B"],
+            "exclude": ["NOISE"],
+            "ignore_case": True,
+        }
+        
+        # A session without include patterns needs every line
+        mock_manager.set_filters(s2, exclude=["NOISE"])
+        assert wait_for_command(lambda c: c["include"] == [])
+        
+        mock_manager.stop_capture()
+        assert mock_manager._command_thread is None
+
+    def test_send_command_does_not_block(self, mock_manager):
+        """A stuck stdin pipe should not block callers, and only the latest command is kept."""
+        mock_manager.native_prefilter = True
+        session_id = mock_manager.create_session("test")
+        unblock = threading.Event()
+        mock_manager._process.stdin.write.side_effect = lambda data: unblock.wait(2)
+        
+        for k in range(100):
+            mock_manager.set_filters(session_id, include=[f"P{k}"])
+        
+        with mock_manager._commands_cond:
+            pending = list(mock_manager._pending_commands.values())
+        assert len(pending) <= 1
+        
+        unblock.set()
+        mock_manager.stop_capture()
 
     def test_set_filters_invalid_session(self, mock_manager):
         """Setting filters on invalid session should fail."""
@@ -315,6 +623,35 @@ class TestCaptureManager:
         entries, _ = mock_manager.get_output(session_id, limit=3)
         assert len(entries) == 3
 
+    def test_get_output_zero_limit_keeps_cursor(self, mock_manager):
+        """A non-positive limit should return nothing without skipping unread entries."""
+        session_id = mock_manager.create_session("test")
+        
+        for i in range(5):
+            mock_manager._buffer.append(DebugEntry(
+                seq=i+1, time=0, pid=1234, text=f"Message {i+1}"
+            ))
+        
+        assert mock_manager.get_output(session_id, limit=0) == ([], 0)
+        assert mock_manager.get_output(session_id, limit=-1) == ([], 0)
+        
+        entries, next_seq = mock_manager.get_output(session_id)
+        assert [e["seq"] for e in entries] == [1, 2, 3, 4, 5]
+        assert next_seq == 5
+
+    def test_get_output_since_seq(self, mock_manager):
+        """Get output should only return entries after since_seq."""
+        session_id = mock_manager.create_session("test")
+        
+        for i in range(10):
+            mock_manager._buffer.append(DebugEntry(
+                seq=i+1, time=0, pid=1234, text=f"Message {i+1}"
+            ))
+        
+        entries, next_seq = mock_manager.get_output(session_id, since_seq=7)
+        assert [e["seq"] for e in entries] == [8, 9, 10]
+        assert next_seq == 10
+
     def test_clear_session(self, mock_manager):
         """Clear session should skip pending entries."""
         session_id = mock_manager.create_session("test")
@@ -349,6 +686,48 @@ class TestCaptureManager:
         assert "filters" in status
         assert "ERROR" in status["filters"]["include"]
 
+    def test_wait_ready(self, mock_manager):
+        """Manager should be ready once the capture process reports it started."""
+        mock_manager.start_capture()
+        assert not mock_manager.wait_ready(timeout=0)
+
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, b'{"status": "started"}\n')
+        os.close(write_fd)
+        try:
+            with patch('dbgcapture_mcp.capture_manager.os', os):
+                mock_manager._status_loop(MagicMock(fileno=lambda: read_fd))
+        finally:
+            os.close(read_fd)
+
+        assert mock_manager.wait_ready(timeout=0)
+
+        mock_manager.stop_capture()
+        assert not mock_manager.wait_ready(timeout=0)
+
+    def test_process_name_cache(self, mock_manager):
+        """Process names should be cached and refreshed when a PID is reused."""
+        with patch('dbgcapture_mcp.capture_manager.psutil.Process') as mock_process, \
+             patch('dbgcapture_mcp.capture_manager.time') as mock_time:
+            mock_time.monotonic.return_value = 100.0
+            mock_process.return_value.create_time.return_value = 1.0
+            mock_process.return_value.name.return_value = "first.exe"
+            
+            assert mock_manager._get_process_name(1234) == "first.exe"
+            assert mock_manager._get_process_name(1234) == "first.exe"
+            assert mock_process.call_count == 1
+            
+            # Same process after the TTL: revalidated without re-reading the name
+            mock_time.monotonic.return_value = 200.0
+            assert mock_manager._get_process_name(1234) == "first.exe"
+            assert mock_process.return_value.name.call_count == 1
+            
+            # PID reused by a new process
+            mock_time.monotonic.return_value = 300.0
+            mock_process.return_value.create_time.return_value = 2.0
+            mock_process.return_value.name.return_value = "second.exe"
+            assert mock_manager._get_process_name(1234) == "second.exe"
+
     def test_list_processes(self, mock_manager):
         """Test process listing."""
         with patch('dbgcapture_mcp.capture_manager.psutil') as mock_psutil:
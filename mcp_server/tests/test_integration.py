@@ -5,30 +5,76 @@ These tests require dbgcapture.exe to be built and verify end-to-end functionali
 """
 
 import ctypes
-import os
-import sys
 import time
+import uuid
 import pytest
 from pathlib import Path
 
-# Skip if not on Windows
-pytestmark = pytest.mark.skipif(
-    sys.platform != "win32",
-    reason="Debug capture only works on Windows"
-)
+
+# Resolved once at import with an explicit signature rather than on every send
+# (conftest.py only collects this module on Windows)
+_ODS = ctypes.WinDLL("kernel32").OutputDebugStringA
+_ODS.argtypes = [ctypes.c_char_p]
+_ODS.restype = None
 
 
 def send_debug_string(message: str):
     """Send a debug string via OutputDebugString."""
-    ctypes.windll.kernel32.OutputDebugStringA(message.encode('ascii') + b'\0')
+    _ODS(message.encode('ascii'))
+
+
+def send_debug_strings(messages):
+    """Send several debug strings back to back, one OutputDebugString call each."""
+    ods = _ODS
+    for message in messages:
+        ods(message.encode('ascii'))
+
+
+def wait_for_marker(manager, session_id, marker, timeout=1.0, interval=0.01):
+    """
+    Poll a session's output until an entry containing marker arrives.
+    
+    Returns every entry read while polling (get_output advances the cursor),
+    or what was read before the timeout if the marker never shows up.
+    """
+    entries = []
+    deadline = time.monotonic() + timeout
+    while True:
+        batch, _ = manager.get_output(session_id, limit=100)
+        entries.extend(batch)
+        if any(marker in e["text"] for e in batch) or time.monotonic() >= deadline:
+            return entries
+        time.sleep(interval)
+
+
+def wait_for_pending(manager, session_id, count, timeout=1.0, interval=0.01):
+    """Poll until a session has at least count unread entries, without reading them."""
+    deadline = time.monotonic() + timeout
+    while manager.get_session_status(session_id)["pending_count"] < count:
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+    return True
+
+
+@pytest.fixture(scope="session")
+def check_exe_exists():
+    """Check if dbgcapture.exe exists, once per test run."""
+    exe_path = Path(__file__).resolve().parents[2] / "dbgcapture" / "dbgcapture.exe"
+    if not exe_path.exists():
+        pytest.skip(f"dbgcapture.exe not found at {exe_path}. Build it first with: nmake")
+    return exe_path
 
 
 class TestCaptureIntegration:
     """Integration tests for the capture system."""
 
-    @pytest.fixture
-    def manager(self):
-        """Get the capture manager."""
+    # Only one debugger can own the DBWIN buffer, so keep these on one xdist worker
+    pytestmark = pytest.mark.xdist_group("capture_singleton")
+
+    @pytest.fixture(scope="class")
+    def manager(self, check_exe_exists):
+        """Get the capture manager, shared by all tests in the class."""
         from dbgcapture_mcp.capture_manager import CaptureManager, get_manager
         
         # Reset singleton for clean test
@@ -40,8 +86,7 @@ class TestCaptureIntegration:
         yield manager
         
         # Cleanup all sessions
-        with manager._sessions_lock:
-            session_ids = list(manager._sessions.keys())
+        session_ids = list(manager._sessions)
         for sid in session_ids:
             manager.destroy_session(sid)
         
@@ -51,15 +96,33 @@ class TestCaptureIntegration:
         CaptureManager._instance = None
         cm._manager = None
 
+    @pytest.fixture(scope="class")
+    def pooled_session(self, manager):
+        """
+        A session reused across tests.
+        
+        It also keeps the capture subprocess running between tests, since
+        destroying the last session stops capture.
+        """
+        return manager.create_session("pooled")
+
     @pytest.fixture
-    def check_exe_exists(self):
-        """Check if dbgcapture.exe exists."""
-        exe_path = Path(__file__).parent.parent.parent / "dbgcapture" / "dbgcapture.exe"
-        if not exe_path.exists():
-            pytest.skip(f"dbgcapture.exe not found at {exe_path}. Build it first with: nmake")
-        return exe_path
-
-    def test_create_and_destroy_session(self, manager, check_exe_exists):
+    def session(self, manager, pooled_session):
+        """The pooled session, reset to no filters and no pending output."""
+        manager.set_filters(pooled_session)
+        manager.clear_session(pooled_session)
+        return pooled_session
+
+    @pytest.fixture(autouse=True)
+    def destroy_leaked_sessions(self, manager, pooled_session):
+        """Destroy any sessions a test leaves behind, keeping capture running."""
+        before = set(manager._sessions)
+        yield
+        leaked = set(manager._sessions) - before
+        for sid in leaked:
+            manager.destroy_session(sid)
+
+    def test_create_and_destroy_session(self, manager):
         """Test creating and destroying a session."""
         session_id = manager.create_session("test-session")
         assert session_id is not None
@@ -79,100 +142,95 @@ class TestCaptureIntegration:
         # Session should be gone
         assert manager.get_session(session_id) is None
 
-    def test_capture_debug_output(self, manager, check_exe_exists):
+    def test_capture_debug_output(self, manager, session):
         """Test capturing OutputDebugString messages."""
-        session_id = manager.create_session("capture-test")
+        session_id = session
         
         # Wait for capture to start
-        time.sleep(0.5)
+        assert manager.wait_ready(timeout=2.0)
         
         # Send unique test messages
-        test_marker = f"[TEST-{time.time()}]"
+        test_marker = f"[TEST-{uuid.uuid4().hex[:8]}]"
         messages = [
             f"{test_marker} Message 1",
             f"{test_marker} Message 2",
             f"{test_marker} Message 3",
         ]
         
-        for msg in messages:
-            send_debug_string(msg)
-            time.sleep(0.05)
+        send_debug_strings(messages)
         
         # Wait for messages to be captured
-        time.sleep(0.5)
-        
-        # Get output
-        entries, _ = manager.get_output(session_id, limit=100)
+        entries = wait_for_marker(manager, session_id, messages[-1])
         
         # Find our messages
         our_entries = [e for e in entries if test_marker in e["text"]]
         
         # We should capture at least some messages (timing dependent)
         assert len(our_entries) >= 1, f"Expected at least 1 message, got {len(our_entries)}"
-        
-        manager.destroy_session(session_id)
 
-    def test_include_filter(self, manager, check_exe_exists):
+    def test_include_filter(self, manager, session):
         """Test include filter functionality."""
-        session_id = manager.create_session("filter-test")
-        time.sleep(0.5)
+        session_id = session
+        assert manager.wait_ready(timeout=2.0)
         
         # Set include filter
-        test_marker = f"INCLUDE-{time.time()}"
+        test_marker = f"INCLUDE-{uuid.uuid4().hex[:8]}"
         manager.set_filters(session_id, include=[test_marker])
         
         # Send messages - some matching, some not
-        send_debug_string(f"[{test_marker}] Should appear")
-        send_debug_string("[OTHER] Should NOT appear")
-        send_debug_string(f"[{test_marker}] Also should appear")
-        
-        time.sleep(0.3)
+        send_debug_strings([
+            f"[{test_marker}] Should appear",
+            "[OTHER] Should NOT appear",
+            f"[{test_marker}] Also should appear",
+        ])
         
-        entries, _ = manager.get_output(session_id, limit=100)
+        entries = wait_for_marker(manager, session_id, "Also should appear")
+        assert any("Also should appear" in e["text"] for e in entries), "Marker message never arrived"
         
         # All entries should contain the test marker
-        for entry in entries:
-            assert test_marker in entry["text"], f"Unexpected entry: {entry['text']}"
-        
-        manager.destroy_session(session_id)
+        assert all(test_marker in e["text"] for e in entries), \
+            f"Unexpected entry: {next(e['text'] for e in entries if test_marker not in e['text'])}"
 
-    def test_exclude_filter(self, manager, check_exe_exists):
+    def test_exclude_filter(self, manager, session):
         """Test exclude filter functionality."""
-        session_id = manager.create_session("exclude-test")
-        time.sleep(0.5)
+        session_id = session
+        assert manager.wait_ready(timeout=2.0)
         
         # Set exclude filter
-        test_marker = f"MYTEST-{time.time()}"
+        test_marker = f"MYTEST-{uuid.uuid4().hex[:8]}"
         exclude_marker = "EXCLUDE_ME"
         manager.set_filters(session_id, include=[test_marker], exclude=[exclude_marker])
         
         # Send messages
-        send_debug_string(f"[{test_marker}] Good message")
-        send_debug_string(f"[{test_marker}] {exclude_marker} Bad message")
-        send_debug_string(f"[{test_marker}] Another good message")
-        
-        time.sleep(0.3)
+        send_debug_strings([
+            f"[{test_marker}] Good message",
+            f"[{test_marker}] {exclude_marker} Bad message",
+            f"[{test_marker}] Another good message",
+        ])
         
-        entries, _ = manager.get_output(session_id, limit=100)
+        entries = wait_for_marker(manager, session_id, "Another good message")
+        assert any("Another good message" in e["text"] for e in entries), "Marker message never arrived"
         
         # No entries should contain the exclude marker
-        for entry in entries:
-            assert exclude_marker not in entry["text"], f"Excluded entry appeared: {entry['text']}"
-        
-        manager.destroy_session(session_id)
+        assert all(exclude_marker not in e["text"] for e in entries), \
+            f"Excluded entry appeared: {next(e['text'] for e in entries if exclude_marker in e['text'])}"
 
-    def test_clear_session(self, manager, check_exe_exists):
+    def test_clear_session(self, manager, session):
         """Test clearing session cursor."""
-        session_id = manager.create_session("clear-test")
-        time.sleep(0.5)
+        session_id = session
+        assert manager.wait_ready(timeout=2.0)
         
-        test_marker = f"CLEAR-{time.time()}"
+        test_marker = f"CLEAR-{uuid.uuid4().hex[:8]}"
+        manager.set_filters(session_id, include=[test_marker])
         
         # Send some messages
-        send_debug_string(f"[{test_marker}] Before clear 1")
-        send_debug_string(f"[{test_marker}] Before clear 2")
+        send_debug_strings([
+            f"[{test_marker}] Before clear 1",
+            f"[{test_marker}] Before clear 2",
+        ])
         
-        time.sleep(0.3)
+        # Wait until the pre-clear messages have been captured (without reading them)
+        assert wait_for_pending(manager, session_id, 2), "Pre-clear messages never arrived"
         
         # Clear the session
         manager.clear_session(session_id)
@@ -180,23 +238,17 @@ class TestCaptureIntegration:
         # Send more messages
         send_debug_string(f"[{test_marker}] After clear 1")
         
-        time.sleep(0.3)
-        
         # Get output - should only see "After clear" messages
-        entries, _ = manager.get_output(session_id, limit=100)
-        
-        our_entries = [e for e in entries if test_marker in e["text"]]
+        entries = wait_for_marker(manager, session_id, "After clear 1")
+        assert any("After clear 1" in e["text"] for e in entries), "Marker message never arrived"
         
         # Should only have the "After clear" message(s)
-        for entry in our_entries:
-            assert "Before clear" not in entry["text"], f"Pre-clear message appeared: {entry['text']}"
-        
-        manager.destroy_session(session_id)
+        assert all("Before clear" not in e["text"] for e in entries), \
+            f"Pre-clear message appeared: {next(e['text'] for e in entries if 'Before clear' in e['text'])}"
 
-    def test_session_status(self, manager, check_exe_exists):
+    def test_session_status(self, manager, session):
         """Test getting session status."""
-        session_id = manager.create_session("status-test")
-        time.sleep(0.3)
+        session_id = session
         
         # Set some filters
         manager.set_filters(session_id, include=[r"\[ERROR\]"], exclude=["NOISE"])
@@ -205,45 +257,44 @@ class TestCaptureIntegration:
         
         assert status is not None
         assert status["session_id"] == session_id
-        assert status["name"] == "status-test"
+        assert status["name"] == "pooled"
         assert r"\[ERROR\]" in status["filters"]["include"]
         assert "NOISE" in status["filters"]["exclude"]
         assert status["capture_running"] is True
-        
-        manager.destroy_session(session_id)
 
-    def test_list_processes(self, manager, check_exe_exists):
+    @pytest.fixture(scope="class")
+    def process_snapshot(self, manager):
+        """Enumerate processes once for all process-listing tests."""
+        return manager.list_processes()
+
+    def test_list_processes(self, process_snapshot):
         """Test listing processes."""
-        # This doesn't require a session
-        processes = manager.list_processes()
+        processes = process_snapshot
         
         assert len(processes) > 0
         
-        # Each process should have pid and name
-        for proc in processes:
-            assert "pid" in proc
-            assert "name" in proc
-            assert isinstance(proc["pid"], int)
-            assert isinstance(proc["name"], str)
+        # Every process comes from the same serializer: check the schema once,
+        # then the field types across the whole list
+        first = processes[0]
+        assert {"pid", "name"} <= first.keys()
+        assert all(isinstance(p["pid"], int) for p in processes)
+        assert all(isinstance(p["name"], str) for p in processes)
 
-    def test_list_processes_filtered(self, manager, check_exe_exists):
+    def test_list_processes_filtered(self, process_snapshot):
         """Test listing processes with filter."""
         # Filter for python processes (should include our test process)
-        processes = manager.list_processes("python")
+        processes = [p for p in process_snapshot if "python" in p["name"].lower()]
         
         # Should find at least one (the test runner)
         assert len(processes) > 0
-        
-        for proc in processes:
-            assert "python" in proc["name"].lower()
 
-    def test_multiple_sessions(self, manager, check_exe_exists):
+    def test_multiple_sessions(self, manager):
         """Test multiple concurrent sessions with different filters."""
         # Create first session and verify capture is running
         session1 = manager.create_session("session-1")
         
         # Wait for capture subprocess to be fully ready
-        time.sleep(0.5)
+        assert manager.wait_ready(timeout=2.0)
         
         # Verify capture is running before creating second session
         assert manager.is_running(), "Capture should be running after first session"
@@ -260,22 +311,16 @@ class TestCaptureIntegration:
         manager.clear_session(session2)
         
         # Use unique markers for this test run to avoid interference
-        test_id = f"{time.time()}"
+        test_id = uuid.uuid4().hex[:8]
         s1_msg = f"[S1] Session1-{test_id}"
         s2_msg = f"[S2] Session2-{test_id}"
         
-        # Send messages for both with delays
-        send_debug_string(s1_msg)
-        time.sleep(0.05)
-        send_debug_string(s2_msg)
-        time.sleep(0.05)
-        send_debug_string(f"[BOTH] Neither-{test_id}")
-        
-        time.sleep(0.5)  # Give time for capture
+        # Send messages for both
+        send_debug_strings([s1_msg, s2_msg, f"[BOTH] Neither-{test_id}"])
         
         # Get outputs
-        entries1, _ = manager.get_output(session1, limit=100)
-        entries2, _ = manager.get_output(session2, limit=100)
+        entries1 = wait_for_marker(manager, session1, s1_msg)
+        entries2 = wait_for_marker(manager, session2, s2_msg)
         
         s1_texts = [e["text"] for e in entries1]
         s2_texts = [e["text"] for e in entries2]
@@ -300,17 +345,15 @@ class TestCaptureIntegration:
         manager.destroy_session(session1)
         manager.destroy_session(session2)
 
-    def test_process_name_in_entries(self, manager, check_exe_exists):
+    def test_process_name_in_entries(self, manager, session):
         """Test that entries include process name."""
-        session_id = manager.create_session("process-name-test")
-        time.sleep(0.5)
+        session_id = session
+        assert manager.wait_ready(timeout=2.0)
         
-        test_marker = f"PROCNAME-{time.time()}"
+        test_marker = f"PROCNAME-{uuid.uuid4().hex[:8]}"
         send_debug_string(f"[{test_marker}] Test message")
         
-        time.sleep(0.3)
-        
-        entries, _ = manager.get_output(session_id, limit=100)
+        entries = wait_for_marker(manager, session_id, test_marker)
         our_entries = [e for e in entries if test_marker in e["text"]]
         
         # Should have process name
@@ -320,5 +363,3 @@ class TestCaptureIntegration:
             # Our process should be python
             assert entry["process_name"] is not None
             assert "python" in entry["process_name"].lower()
-        
-        manager.destroy_session(session_id)
@@ -7,10 +7,10 @@ since the internal handler storage is not part of the public API.
 
 import json
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import MagicMock
 
 from dbgcapture_mcp.server import create_server
-from dbgcapture_mcp.capture_manager import CaptureManager
+from dbgcapture_mcp.capture_manager import CaptureManager, compile_pattern
 
 
 class TestCreateServer:
@@ -31,6 +31,8 @@ class TestToolHandlerLogic:
     we test the underlying capture_manager functionality that the handlers use.
     """
 
+    pytestmark = pytest.mark.xdist_group("capture_singleton")
+
     @pytest.fixture
     def reset_singleton(self):
         """Reset the CaptureManager singleton before and after each test."""
@@ -43,86 +45,64 @@ class TestToolHandlerLogic:
         cm._manager = old_manager
         CaptureManager._instance = old_instance
 
-    def test_manager_create_session(self, reset_singleton):
+    @pytest.fixture
+    def mocked_manager(self, reset_singleton, monkeypatch):
+        """Get a manager whose capture subprocess is mocked out."""
+        import dbgcapture_mcp.capture_manager as cm
+        
+        mock_subprocess = MagicMock()
+        mock_subprocess.Popen.return_value.poll.return_value = None
+        mock_subprocess.CREATE_NO_WINDOW = 0
+        mock_os = MagicMock()
+        mock_os.read.return_value = b""  # Capture output at EOF
+        monkeypatch.setattr(cm, "subprocess", mock_subprocess)
+        monkeypatch.setattr(cm, "os", mock_os)
+        
+        manager = cm.get_manager()
+        manager._capture_exe = MagicMock()
+        manager._capture_exe.exists.return_value = True
+        
+        yield manager
+        
+        manager._running = False
+
+    def test_manager_create_session(self, mocked_manager):
         """Test create_session through manager."""
-        with patch('dbgcapture_mcp.capture_manager.subprocess') as mock_subprocess:
-            mock_process = MagicMock()
-            mock_process.poll.return_value = None
-            mock_process.stdout.readline.return_value = ""
-            mock_subprocess.Popen.return_value = mock_process
-            mock_subprocess.CREATE_NO_WINDOW = 0
-            
-            from dbgcapture_mcp.capture_manager import get_manager
-            manager = get_manager()
-            manager._capture_exe = MagicMock()
-            manager._capture_exe.exists.return_value = True
-            
-            session_id = manager.create_session("test-session")
-            
-            assert session_id is not None
-            assert len(session_id) == 8
-            
-            session = manager.get_session(session_id)
-            assert session.name == "test-session"
-            
-            # Cleanup
-            manager._running = False
+        session_id = mocked_manager.create_session("test-session")
+        
+        assert session_id is not None
+        assert len(session_id) == 8
+        
+        session = mocked_manager.get_session(session_id)
+        assert session.name == "test-session"
 
-    def test_manager_destroy_session(self, reset_singleton):
+    def test_manager_destroy_session(self, mocked_manager):
         """Test destroy_session through manager."""
-        with patch('dbgcapture_mcp.capture_manager.subprocess') as mock_subprocess:
-            mock_process = MagicMock()
-            mock_process.poll.return_value = None
-            mock_process.stdout.readline.return_value = ""
-            mock_subprocess.Popen.return_value = mock_process
-            mock_subprocess.CREATE_NO_WINDOW = 0
-            
-            from dbgcapture_mcp.capture_manager import get_manager
-            manager = get_manager()
-            manager._capture_exe = MagicMock()
-            manager._capture_exe.exists.return_value = True
-            
-            session_id = manager.create_session("test")
-            assert manager.get_session(session_id) is not None
-            
-            result = manager.destroy_session(session_id)
-            assert result is True
-            assert manager.get_session(session_id) is None
-            
-            # Non-existent session
-            result = manager.destroy_session("nonexistent")
-            assert result is False
-            
-            manager._running = False
+        session_id = mocked_manager.create_session("test")
+        assert mocked_manager.get_session(session_id) is not None
+        
+        result = mocked_manager.destroy_session(session_id)
+        assert result is True
+        assert mocked_manager.get_session(session_id) is None
+        
+        # Non-existent session
+        result = mocked_manager.destroy_session("nonexistent")
+        assert result is False
 
-    def test_manager_set_filters(self, reset_singleton):
+    def test_manager_set_filters(self, mocked_manager):
         """Test set_filters through manager."""
-        with patch('dbgcapture_mcp.capture_manager.subprocess') as mock_subprocess:
-            mock_process = MagicMock()
-            mock_process.poll.return_value = None
-            mock_process.stdout.readline.return_value = ""
-            mock_subprocess.Popen.return_value = mock_process
-            mock_subprocess.CREATE_NO_WINDOW = 0
-            
-            from dbgcapture_mcp.capture_manager import get_manager
-            manager = get_manager()
-            manager._capture_exe = MagicMock()
-            manager._capture_exe.exists.return_value = True
-            
-            session_id = manager.create_session("test")
-            
-            result = manager.set_filters(
-                session_id,
-                include=[r"\[ERROR\]"],
-                exclude=[r"NOISE"]
-            )
-            assert result is True
-            
-            session = manager.get_session(session_id)
-            assert len(session.filters.include_patterns) == 1
-            assert len(session.filters.exclude_patterns) == 1
-            
-            manager._running = False
+        session_id = mocked_manager.create_session("test")
+        
+        result = mocked_manager.set_filters(
+            session_id,
+            include=[r"\[ERROR\]"],
+            exclude=[r"NOISE"]
+        )
+        assert result is True
+        
+        session = mocked_manager.get_session(session_id)
+        assert len(session.filters.include_patterns) == 1
+        assert len(session.filters.exclude_patterns) == 1
 
 
 class TestRegexValidation:
@@ -130,7 +110,6 @@ class TestRegexValidation:
     
     def test_valid_regex_patterns(self):
         """Valid regex patterns should be accepted."""
-        import re
         valid_patterns = [
             r"\[ERROR\]",
             r"test.*message",
@@ -140,7 +119,7 @@ class TestRegexValidation:
         ]
         for pattern in valid_patterns:
             # Should not raise
-            re.compile(pattern)
+            compile_pattern(pattern)
     
     def test_invalid_regex_detection(self):
         """Invalid regex patterns should raise re.error."""
@@ -151,119 +130,87 @@ class TestRegexValidation:
         ]
         for pattern in invalid_patterns:
             with pytest.raises(re.error):
-                re.compile(pattern)
+                compile_pattern(pattern)
+
+    def test_validation_shares_compiled_pattern(self):
+        """Validating a pattern should compile the same object set_filters uses."""
+        assert compile_pattern(r"\[ERROR\]") is compile_pattern(r"\[ERROR\]")
+
+
+def _get(data, key):
+    """Look up a dotted key path (e.g. "filters.include", "entries.0.text") in parsed JSON."""
+    for part in key.split("."):
+        data = data[int(part)] if isinstance(data, list) else data[part]
+    return data
 
 
 class TestJsonResponses:
     """Test JSON response formatting."""
     
-    def test_session_created_response(self):
-        """Test session created response format."""
-        session_id = "abc12345"
-        response = f'{{"session_id": "{session_id}", "status": "created", "capture_running": true}}'
-        data = json.loads(response)
-        
-        assert data["session_id"] == session_id
-        assert data["status"] == "created"
-        assert data["capture_running"] is True
-    
-    def test_session_destroyed_response(self):
-        """Test session destroyed response format."""
-        session_id = "abc123"
-        response = f'{{"session_id": "{session_id}", "status": "destroyed"}}'
-        data = json.loads(response)
-        
-        assert data["session_id"] == session_id
-        assert data["status"] == "destroyed"
-    
-    def test_error_response(self):
-        """Test error response format."""
-        session_id = "nonexistent"
-        response = f'{{"error": "Session not found: {session_id}"}}'
-        data = json.loads(response)
-        
-        assert "error" in data
-        assert session_id in data["error"]
-    
-    def test_filters_set_response(self):
-        """Test filters_set response format."""
-        filters = {
-            "include": [r"\[ERROR\]"],
-            "exclude": [],
-            "process_names": [],
-            "process_pids": []
-        }
-        response = json.dumps({"status": "filters_set", "filters": filters})
-        data = json.loads(response)
-        
-        assert data["status"] == "filters_set"
-        assert "filters" in data
-        assert data["filters"]["include"] == [r"\[ERROR\]"]
-    
-    def test_get_output_response(self):
-        """Test get_output response format."""
-        entries = [
-            {"seq": 1, "pid": 1234, "text": "Test", "process_name": "test.exe", "time": 0}
-        ]
-        response = json.dumps({
-            "entries": entries,
-            "count": len(entries),
-            "next_seq": 1
-        })
-        data = json.loads(response)
-        
-        assert data["count"] == 1
-        assert len(data["entries"]) == 1
-        assert data["next_seq"] == 1
-    
-    def test_session_status_response(self):
-        """Test session_status response format."""
-        status = {
-            "session_id": "abc123",
-            "name": "test",
-            "filters": {
-                "include": [],
-                "exclude": [],
-                "process_names": [],
-                "process_pids": []
+    @pytest.mark.parametrize("payload,assertions", [
+        pytest.param(
+            '{"session_id": "abc12345", "status": "created", "capture_running": true}',
+            [("session_id", "abc12345"), ("status", "created"), ("capture_running", True)],
+            id="session_created",
+        ),
+        pytest.param(
+            '{"session_id": "abc123", "status": "destroyed"}',
+            [("session_id", "abc123"), ("status", "destroyed")],
+            id="session_destroyed",
+        ),
+        pytest.param(
+            '{"error": "Session not found: nonexistent"}',
+            [("error", "Session not found: nonexistent")],
+            id="error",
+        ),
+        pytest.param(
+            {
+                "status": "filters_set",
+                "filters": {"include": [r"\[ERROR\]"], "exclude": [], "process_names": [], "process_pids": []},
             },
-            "cursor": 0,
-            "pending_count": 5,
-            "capture_running": True,
-            "total_buffered": 100
-        }
-        response = json.dumps(status)
-        data = json.loads(response)
-        
-        assert data["session_id"] == "abc123"
-        assert data["pending_count"] == 5
-    
-    def test_list_processes_response(self):
-        """Test list_processes response format."""
-        processes = [
-            {"pid": 1234, "name": "python.exe"},
-            {"pid": 5678, "name": "notepad.exe"}
-        ]
-        response = json.dumps({"processes": processes, "count": len(processes)})
-        data = json.loads(response)
-        
-        assert data["count"] == 2
-        assert len(data["processes"]) == 2
-    
-    def test_list_sessions_response(self):
-        """Test list_sessions response format."""
-        sessions = [
-            {"session_id": "abc123", "name": "test-session", "cursor": 5}
-        ]
-        response = json.dumps({
-            "sessions": sessions,
-            "count": len(sessions),
-            "capture_running": True
-        })
+            [("status", "filters_set"), ("filters.include", [r"\[ERROR\]"])],
+            id="filters_set",
+        ),
+        pytest.param(
+            {
+                "entries": [{"seq": 1, "pid": 1234, "text": "Test", "process_name": "test.exe", "time": 0}],
+                "count": 1,
+                "next_seq": 1,
+            },
+            [("count", 1), ("entries.0.text", "Test"), ("next_seq", 1)],
+            id="get_output",
+        ),
+        pytest.param(
+            {
+                "session_id": "abc123",
+                "name": "test",
+                "filters": {"include": [], "exclude": [], "process_names": [], "process_pids": []},
+                "cursor": 0,
+                "pending_count": 5,
+                "capture_running": True,
+                "total_buffered": 100,
+            },
+            [("session_id", "abc123"), ("pending_count", 5)],
+            id="session_status",
+        ),
+        pytest.param(
+            {"processes": [{"pid": 1234, "name": "python.exe"}, {"pid": 5678, "name": "notepad.exe"}], "count": 2},
+            [("count", 2), ("processes.1.name", "notepad.exe")],
+            id="list_processes",
+        ),
+        pytest.param(
+            {"sessions": [{"session_id": "abc123", "name": "test-session", "cursor": 5}], "count": 1, "capture_running": True},
+            [("count", 1), ("capture_running", True)],
+            id="list_sessions",
+        ),
+    ])
+    def test_response_roundtrip(self, payload, assertions):
+        """Responses (raw strings as the server formats them, or dicts) should parse as JSON."""
+        response = payload if isinstance(payload, str) else json.dumps(payload)
         data = json.loads(response)
         
-        assert data["count"] == 1
-        assert data["capture_running"] is True
+        for key, expected in assertions:
+            assert _get(data, key) == expected
 
 
 class TestServerToolsMetadata:
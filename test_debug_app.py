@@ -26,40 +26,135 @@ Examples:
 
 import argparse
 import ctypes
+import os
 import random
 import string
+import struct
 import sys
+import threading
 import time
-from datetime import datetime
+from collections import deque
+from operator import itemgetter
+
+
+# Bound once with explicit signatures so each send is a direct foreign call.
+# The wide variant takes str as-is; the ANSI one takes pre-encoded bytes.
+if sys.platform == "win32":
+    _kernel32 = ctypes.WinDLL("kernel32")
+    _ODS = _kernel32.OutputDebugStringA
+    _ODS.argtypes = [ctypes.c_char_p]
+    _ODS.restype = None
+    _ODSW = _kernel32.OutputDebugStringW
+    _ODSW.argtypes = [ctypes.c_wchar_p]
+    _ODSW.restype = None
 
 
 def output_debug_string(message: str):
     """Send a debug string via Windows OutputDebugString API."""
-    ctypes.windll.kernel32.OutputDebugStringA(message.encode('ascii', errors='replace') + b'\0')
+    _ODSW(message)
+
+
+def _ts() -> str:
+    """Current local time as HH:MM:SS.mmm."""
+    t = time.time()
+    s = int(t)
+    lt = time.localtime(s)
+    return "%02d:%02d:%02d.%03d" % (lt.tm_hour, lt.tm_min, lt.tm_sec, int((t - s) * 1000))
+
+
+# With --spin, intervals shorter than this are spun on perf_counter(), since
+# Windows sleeps in whole scheduler ticks
+_SPIN_THRESHOLD = 1e-3
+
+
+def _pause(interval: float, spin: bool = False):
+    """Wait between messages; an interval of 0 (or less) doesn't wait at all."""
+    if interval <= 0:
+        return
+    if spin and interval < _SPIN_THRESHOLD:
+        deadline = time.perf_counter() + interval
+        while time.perf_counter() < deadline:
+            pass
+    else:
+        time.sleep(interval)
+
+
+# Lines of "Sent" output to buffer before writing them to stdout
+_LOG_BATCH = 256
 
 
-def generate_random_data(length: int = 10) -> str:
+def _write_log(log: bytearray):
+    """Write buffered output lines to stdout, after anything already printed."""
+    sys.stdout.flush()
+    sys.stdout.buffer.write(log)
+    sys.stdout.buffer.flush()
+    log.clear()
+
+
+# Largest batched burst send: the DBWIN_BUFFER debuggers read from is 4 KiB,
+# including the 4-byte PID header and the terminating null
+_BATCH_BYTES = 4000
+
+
+def _batch_messages(messages: list, limit: int = _BATCH_BYTES) -> list:
+    """Join messages into newline-separated blocks of at most limit bytes."""
+    batches = []
+    block = bytearray()
+    for message in messages:
+        if block and len(block) + 1 + len(message) > limit:
+            batches.append(bytes(block))
+            block.clear()
+        if block:
+            block += b"\n"
+        block += message
+    if block:
+        batches.append(bytes(block))
+    return batches
+
+
+# Maps each random byte to an alphanumeric character. The top 256 % 62 byte
+# values are dropped instead, so every character is equally likely.
+_ALPHABET = (string.ascii_letters + string.digits).encode('ascii')
+_ALPHANUMERIC = bytes(_ALPHABET[b % len(_ALPHABET)] for b in range(256))
+_UNMAPPED = bytes(range(256 - 256 % len(_ALPHABET), 256))
+
+
+def generate_random_data(length: int = 10) -> bytes:
     """Generate random alphanumeric data."""
-    return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
+    data = b""
+    while len(data) < length:
+        # Draw a little extra to cover the dropped bytes
+        need = length - len(data)
+        data += os.urandom(need + need // 16 + 8).translate(_ALPHANUMERIC, _UNMAPPED)
+    return data[:length]
 
 
 def run_basic_mode(args):
     """Send a fixed number of messages with a single tag."""
-    print(f"Sending {args.count} messages with tag [{args.tag}]...")
-    print(f"Interval: {args.interval}s")
+    count, tag, text, interval = args.count, args.tag, args.message, args.interval
+    spin = args.spin
+    print(f"Sending {count} messages with tag [{tag}]...")
+    print(f"Interval: {interval}s")
     print()
     
-    for i in range(1, args.count + 1):
-        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-        message = f"[{args.tag}] [{timestamp}] Message {i}/{args.count}: {args.message}"
+    log = bytearray()
+    encoding = sys.stdout.encoding
+    for i in range(1, count + 1):
+        timestamp = _ts()
+        message = f"[{tag}] [{timestamp}] Message {i}/{count}: {text}"
         
         output_debug_string(message)
-        print(f"  Sent: {message}")
+        log += b"  Sent: " + message.encode(encoding, errors='replace') + b"\n"
+        
+        # Show progress live when pacing; otherwise write in batches
+        if interval > 0 or i % _LOG_BATCH == 0:
+            _write_log(log)
         
-        if i < args.count:
-            time.sleep(args.interval)
+        if i < count:
+            _pause(interval, spin)
     
-    print(f"\nDone! Sent {args.count} messages.")
+    _write_log(log)
+    print(f"\nDone! Sent {count} messages.")
 
 
 def run_multi_tag_mode(args):
@@ -74,22 +169,37 @@ def run_multi_tag_mode(args):
         "VERBOSE": "Verbose: detailed trace data"
     }
     
-    print(f"Sending {args.count} messages with multiple tags: {tags}")
+    count, interval, spin = args.count, args.interval, args.spin
+    print(f"Sending {count} messages with multiple tags: {tags}")
     print("Use MCP filters to test include/exclude patterns!")
     print()
     
-    for i in range(1, args.count + 1):
-        tag = random.choice(tags)
-        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-        message = f"[{tag}] [{timestamp}] #{i}: {levels[tag]} - {generate_random_data(8)}"
+    # Draw every message's tag and 8-character payload up front
+    chosen_tags = random.choices(tags, k=count)
+    pool = generate_random_data(count * 8)
+    
+    # The constant parts of each tag's messages, formatted once
+    prefix = {tag: f"[{tag}] [".encode('ascii') for tag in tags}
+    middle = {tag: f": {levels[tag]} - ".encode('ascii') for tag in tags}
+    label = {tag: f"  [{tag}] ".encode('ascii') for tag in tags}
+    
+    log = bytearray()
+    for i, tag in enumerate(chosen_tags, 1):
+        timestamp = _ts().encode('ascii')
+        message = prefix[tag] + timestamp + b"] #%d" % i + middle[tag] + pool[(i - 1) * 8:i * 8]
         
-        output_debug_string(message)
-        print(f"  [{tag}] {message}")
+        _ODS(message)
+        log += label[tag] + message + b"\n"
+        
+        # Show progress live when pacing; otherwise write in batches
+        if interval > 0 or i % _LOG_BATCH == 0:
+            _write_log(log)
         
-        if i < args.count:
-            time.sleep(args.interval)
+        if i < count:
+            _pause(interval, spin)
     
-    print(f"\nDone! Sent {args.count} messages across {len(tags)} tags.")
+    _write_log(log)
+    print(f"\nDone! Sent {count} messages across {len(tags)} tags.")
     print("\nFilter suggestions:")
     print("  - Include only errors: set_filters(include=[r'\\[ERROR\\]'])")
     print("  - Exclude verbose: set_filters(exclude=[r'\\[VERBOSE\\]', r'\\[TRACE\\]'])")
@@ -97,7 +207,8 @@ def run_multi_tag_mode(args):
 
 def run_continuous_mode(args):
     """Run continuously until interrupted."""
-    print(f"Continuous mode - sending [{args.tag}] messages every {args.interval}s")
+    tag, text, interval, spin = args.tag, args.message, args.interval, args.spin
+    print(f"Continuous mode - sending [{tag}] messages every {interval}s")
     print("Press Ctrl+C to stop...")
     print()
     
@@ -105,73 +216,131 @@ def run_continuous_mode(args):
     try:
         while True:
             count += 1
-            timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-            message = f"[{args.tag}] [{timestamp}] Continuous #{count}: {args.message}"
+            timestamp = _ts()
+            message = f"[{tag}] [{timestamp}] Continuous #{count}: {text}"
             
             output_debug_string(message)
             print(f"  Sent #{count}: {message}")
             
-            time.sleep(args.interval)
+            _pause(interval, spin)
     except KeyboardInterrupt:
         print(f"\n\nStopped after {count} messages.")
 
 
+def _send_all(messages: list):
+    """Send messages back to back through OutputDebugStringA."""
+    # Drive the sends from C: map() calls OutputDebugStringA for each message
+    # and the zero-length deque consumes it without a Python-level loop
+    deque(map(_ODS, messages), maxlen=0)
+
+
 def run_burst_mode(args):
     """Send a burst of messages as fast as possible."""
     burst_count = args.burst
-    print(f"Burst mode - sending {burst_count} messages as fast as possible...")
+    threads = max(args.threads, 1)
+    producers = f" from {threads} threads" if threads > 1 else ""
+    print(f"Burst mode - sending {burst_count} messages as fast as possible{producers}...")
     
     start = time.perf_counter()
     
-    for i in range(1, burst_count + 1):
-        message = f"[BURST] #{i}: {generate_random_data(20)}"
-        output_debug_string(message)
+    # Random alphanumeric payloads for every message in one bulk draw
+    pool = generate_random_data(burst_count * 20)
+    
+    # Split and format without running any bytecode per message: struct cuts
+    # the pool into 20-byte payloads and the format's __mod__ is mapped over
+    # (number, payload) pairs
+    payloads = map(itemgetter(0), struct.iter_unpack("20s", pool))
+    messages = list(map(b"[BURST] #%d: %b".__mod__, zip(range(1, burst_count + 1), payloads)))
+    
+    # One contiguous share of the messages per producer thread
+    shares = [
+        messages[k * burst_count // threads:(k + 1) * burst_count // threads]
+        for k in range(threads)
+    ]
+    
+    # Each OutputDebugString call takes the system-wide DBWinMutex, so send
+    # many messages per call; a capture shows each batch as one entry
+    sends = [_batch_messages(share) if args.batch else share for share in shares]
+    
+    if threads == 1:
+        _send_all(sends[0])
+    else:
+        # OutputDebugStringA runs without the GIL, so producers only contend
+        # on DBWinMutex; the barrier starts them together
+        barrier = threading.Barrier(threads)
+        thread_elapsed = [0.0] * threads
+        
+        def produce(k):
+            barrier.wait()
+            thread_start = time.perf_counter()
+            _send_all(sends[k])
+            thread_elapsed[k] = time.perf_counter() - thread_start
+        
+        workers = [threading.Thread(target=produce, args=(k,)) for k in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
     
     elapsed = time.perf_counter() - start
     rate = burst_count / elapsed if elapsed > 0 else 0
     
-    print(f"Done! Sent {burst_count} messages in {elapsed:.3f}s ({rate:.0f} msg/s)")
+    if threads > 1:
+        for k in range(threads):
+            thread_rate = len(shares[k]) / thread_elapsed[k] if thread_elapsed[k] > 0 else 0
+            print(f"  Thread {k + 1}: {len(shares[k])} messages in "
+                  f"{thread_elapsed[k]:.3f}s ({thread_rate:.0f} msg/s)")
+    
+    print(f"Done! Sent {burst_count} messages in {sum(map(len, sends))} calls, "
+          f"{elapsed:.3f}s ({rate:.0f} msg/s)")
     print("\nThis tests the ring buffer and high-throughput capture.")
 
 
+# Message patterns for regex filter testing, with their categories
+_PATTERNS = [
+    ("[APP:Main] Starting application v1.0.0", "App lifecycle"),
+    ("[APP:Main] Configuration loaded from config.json", "App lifecycle"),
+    ("[DB:Query] SELECT * FROM users WHERE id = 123", "Database"),
+    ("[DB:Query] INSERT INTO logs (msg) VALUES ('test')", "Database"),
+    ("[HTTP:Request] GET /api/users/123 HTTP/1.1", "HTTP"),
+    ("[HTTP:Response] 200 OK (45ms)", "HTTP"),
+    ("[PERF] Frame time: 16.7ms (60 FPS)", "Performance"),
+    ("[PERF] Memory usage: 256MB / 1024MB", "Performance"),
+    ("[SECURITY] Authentication successful for user 'admin'", "Security"),
+    ("[SECURITY] Failed login attempt from 192.168.1.100", "Security"),
+    ("[CACHE] Cache hit for key 'user:123'", "Cache"),
+    ("[CACHE] Cache miss - loading from database", "Cache"),
+    ("[ERROR] NullReferenceException in ProcessData()", "Error"),
+    ("[ERROR] Connection timeout after 30s", "Error"),
+    ("[WARN] Deprecated API usage detected", "Warning"),
+    ("[WARN] Low disk space: 500MB remaining", "Warning"),
+]
+
+# Each pattern pre-encoded with the separator its timestamp follows
+_PATTERNS_BYTES = [pattern.encode('ascii') + b" @" for pattern, _ in _PATTERNS]
+
+
 def run_pattern_mode(args):
     """Send messages with specific patterns for regex testing."""
-    patterns = [
-        ("[APP:Main] Starting application v1.0.0", "App lifecycle"),
-        ("[APP:Main] Configuration loaded from config.json", "App lifecycle"),
-        ("[DB:Query] SELECT * FROM users WHERE id = 123", "Database"),
-        ("[DB:Query] INSERT INTO logs (msg) VALUES ('test')", "Database"),
-        ("[HTTP:Request] GET /api/users/123 HTTP/1.1", "HTTP"),
-        ("[HTTP:Response] 200 OK (45ms)", "HTTP"),
-        ("[PERF] Frame time: 16.7ms (60 FPS)", "Performance"),
-        ("[PERF] Memory usage: 256MB / 1024MB", "Performance"),
-        ("[SECURITY] Authentication successful for user 'admin'", "Security"),
-        ("[SECURITY] Failed login attempt from 192.168.1.100", "Security"),
-        ("[CACHE] Cache hit for key 'user:123'", "Cache"),
-        ("[CACHE] Cache miss - loading from database", "Cache"),
-        ("[ERROR] NullReferenceException in ProcessData()", "Error"),
-        ("[ERROR] Connection timeout after 30s", "Error"),
-        ("[WARN] Deprecated API usage detected", "Warning"),
-        ("[WARN] Low disk space: 500MB remaining", "Warning"),
-    ]
-    
     print("Pattern mode - sending diverse message patterns for regex filter testing")
-    print(f"Sending {len(patterns)} unique patterns, {args.count} iterations each")
+    count, interval, verbose, spin = args.count, args.interval, args.verbose, args.spin
+    print(f"Sending {len(_PATTERNS)} unique patterns, {count} iterations each")
     print()
     
     total = 0
-    for iteration in range(args.count):
-        for pattern, category in patterns:
-            timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-            message = f"{pattern} @{timestamp}"
-            output_debug_string(message)
-            total += 1
-            
-            if args.verbose:
-                print(f"  [{category}] {message}")
+    for iteration in range(count):
+        # One timestamp per pass over the patterns
+        timestamp = _ts().encode('ascii')
+        for pattern in _PATTERNS_BYTES:
+            _ODS(pattern + timestamp)
+        total += len(_PATTERNS_BYTES)
+        
+        if verbose:
+            for pattern, category in _PATTERNS:
+                print(f"  [{category}] {pattern} @{timestamp.decode('ascii')}")
         
-        if iteration < args.count - 1:
-            time.sleep(args.interval)
+        if iteration < count - 1:
+            _pause(interval, spin)
     
     print(f"\nDone! Sent {total} messages.")
     print("\nFilter suggestions:")
@@ -194,7 +363,7 @@ def run_interactive_mode(args):
             if user_input.lower() == 'quit':
                 break
             if user_input:
-                timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+                timestamp = _ts()
                 message = f"[{args.tag}] [{timestamp}] {user_input}"
                 output_debug_string(message)
                 print(f"  Sent: {message}")
@@ -222,6 +391,8 @@ Examples:
   %(prog)s --multi-tag --count 100
   %(prog)s --continuous --interval 2.0
   %(prog)s --burst 5000
+  %(prog)s --burst 5000 --no-batch
+  %(prog)s --burst 100000 --threads 4
   %(prog)s --pattern --count 3
   %(prog)s --interactive
         """
@@ -237,6 +408,14 @@ Examples:
                         help="Custom message content")
     parser.add_argument("--verbose", "-v", action="store_true",
                         help="Verbose output")
+    parser.add_argument("--spin", action="store_true",
+                        help="Busy-wait intervals under 1 ms instead of sleeping "
+                             "(keeps a CPU core busy)")
+    parser.add_argument("--threads", type=int, default=1, metavar="N",
+                        help="Burst mode: send from N threads at once (default: 1)")
+    parser.add_argument("--no-batch", dest="batch", action="store_false",
+                        help="Burst mode: one OutputDebugString call per message "
+                             "instead of batching messages into 4 KB blocks")
     
     # Mode selection
     mode_group = parser.add_mutually_exclusive_group()
@@ -260,7 +439,7 @@ Examples:
     print("=" * 60)
     print("Debug Output Test Application")
     print("=" * 60)
-    print(f"PID: {ctypes.windll.kernel32.GetCurrentProcessId()}")
+    print(f"PID: {os.getpid()}")
     print()
     
     if args.burst: